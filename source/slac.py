@@ -1,5 +1,10 @@
 import math
-from collections import Counter
+import re
+import string
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import repeat
 
 # Converts comparison symbols to alternatives that can be used to convey the quality/frequency of that symbol within a
 # simplified block of symbols.
@@ -15,6 +20,9 @@ SYMBOL_QUALITY_MAP = {"-": ["-", "~"],
                       "U": ["U", "u"],
                       }
 
+# Flattened lookup of each comparison symbol to its mixed alternative, for use when abbreviating blocks.
+MIXED_SYMBOL_MAP = {symbol: alternatives[1] for symbol, alternatives in SYMBOL_QUALITY_MAP.items()}
+
 DEFAULT_SIZE = 50
 # What proportion of the block must be the most common character for it to be used in the short version of the alignment
 # and not the alternative character.
@@ -28,7 +36,305 @@ DISPLAY_MODE_SHORT = "short"
 DISPLAY_MODE_FULL = "full"
 DISPLAY_MODE_FULL_HIT = "hits"
 
+# Number of positions of each comparison case within an alignment, from which the metrics are calculated. Overhangs are
+# positions of a sequence outside the span of the other, and uncounted positions are those with unexpected cases.
+AlignmentCounts = namedtuple("AlignmentCounts", ["coding_matches", "coding_mismatches", "non_coding_matches",
+                                                 "non_coding_mismatches", "coding_inserts", "non_coding_inserts",
+                                                 "coding_deletions", "non_coding_deletions", "coding_overhang",
+                                                 "non_coding_overhang", "unmatched_hit_overhang", "uncounted"])
+
+# Identity, coverage and concordance of the hit to the genomic and coding sequences, as percentages.
+AlignmentMetrics = namedtuple("AlignmentMetrics", ["identity_to_genomic", "coverage_to_genomic",
+                                                   "concordance_to_genomic", "identity_to_cds", "coverage_to_cds",
+                                                   "concordance_to_cds"])
+
+# Character representing a gap in the aligned sequences.
+GAP = "-"
+
+# Translation applied to input sequences, converting them to uppercase and treating spaces as gaps in a single pass.
+NORMALISATION_TABLE = str.maketrans(string.ascii_lowercase + " ", string.ascii_uppercase + GAP)
+
+# Runs of consecutive gaps within a sequence.
+GAP_RUN_PATTERN = re.compile(re.escape(GAP) + "+")
+
+# Runs of hit insertions within the full symbolic alignment.
+INSERTION_RUN_PATTERN = re.compile(r"\^+")
+
+# Symbols of columns covered by the cds. Insertions directly following one of these are within an exon.
+CODING_SYMBOLS = "|=X?"
+
+
+def _decode_sequence(sequence):
+    """
+    Decode a sequence supplied as bytes, eg straight from a file or alignment parser, to a string.
+
+    Args:
+        sequence: (str, bytes, bytearray or memoryview) the sequence, or None if it was not supplied.
+
+    Returns:
+        (str) the decoded sequence, or the sequence unchanged if it was not bytes.
+    """
+    if isinstance(sequence, memoryview) and not sequence.contiguous:
+        # Only contiguous buffers can be decoded directly, so a strided view is copied out first.
+        sequence = sequence.tobytes()
+    if isinstance(sequence, (bytes, bytearray, memoryview)):
+        # Latin-1 maps each byte to one character and never fails, leaving non-ASCII bytes to the ASCII check.
+        return str(sequence, "latin-1")
+    return sequence
+
+
+def _normalise_sequence(sequence):
+    """
+    Normalise a sequence to uppercase, with spaces treated as gaps.
+
+    Args:
+        sequence: (str) the sequence, or None if it was not supplied.
+
+    Returns:
+        (str) the normalised sequence, or an empty string if no sequence was supplied.
+    """
+    return sequence.translate(NORMALISATION_TABLE) if sequence else ""
+
+
+def _prepare_sequence(sequence, name):
+    """
+    Decode, check and normalise a single input sequence.
+
+    Args:
+        sequence: (str, bytes, bytearray or memoryview) the sequence, or None if it was not supplied.
+        name: (str) the name of the sequence, used in error messages.
+
+    Returns:
+        (str) the normalised sequence, or an empty string if no sequence was supplied.
+
+    Raises:
+        ValueError: The sequence is not a string or bytes, or contains non-ASCII characters.
+    """
+    sequence = _decode_sequence(sequence)
+    if not sequence:
+        return ""
+    if not isinstance(sequence, str):
+        raise ValueError(f"{name} must be a string or bytes, not {type(sequence)}")
+    if not sequence.isascii():
+        raise ValueError("Sequences must only contain ASCII characters")
+    return _normalise_sequence(sequence)
+
+
+def _validate_size_limit(size_limit):
+    """
+    Check the miniSLAC size limit when it is set, rather than when the miniSLAC is first generated.
+
+    Args:
+        size_limit: (int) the maximum number of characters to display in the miniSLAC output.
+
+    Returns:
+        (int) the size limit.
+
+    Raises:
+        ValueError: The size limit is less than 1.
+    """
+    size_limit = int(size_limit)
+    if size_limit < 1:
+        raise ValueError(f"size_limit must be at least 1, not {size_limit}")
+    return size_limit
+
+
+def _validate_display_mode(display_mode):
+    """
+    Check the default display mode, falling back to the miniSLAC if none was given.
+
+    Args:
+        display_mode: (str) the default display mode, or None.
+
+    Returns:
+        (str) the display mode.
+
+    Raises:
+        ValueError: The display mode is not one of the supported modes.
+    """
+    if display_mode and display_mode not in [DISPLAY_MODE_SHORT, DISPLAY_MODE_FULL, DISPLAY_MODE_FULL_HIT]:
+        raise ValueError(f"Invalid display mode: {display_mode}. Must be one of: "
+                         f"{DISPLAY_MODE_SHORT}, {DISPLAY_MODE_FULL}, {DISPLAY_MODE_FULL_HIT}")
+    return display_mode or DISPLAY_MODE_SHORT
+
+
+def _percentage(numerator, denominator):
+    """
+    Express a ratio of two counts as a percentage, rounded to the metric precision. The counts are only divided here,
+    at the point a metric is read, so they stay exact integers until then.
+
+    Args:
+        numerator: (int) the count of positions meeting the metric.
+        denominator: (int) the count of positions the metric is relative to.
+
+    Returns:
+        (float) the percentage, or 0 if there are no positions to compare against.
+    """
+    if not denominator:
+        return 0
+    return round(float(numerator) / denominator * 100, METRIC_DECIMALS)
+
+
+def _classify_column(g, c, h):
+    """
+    Determine the comparison symbol for a single column of the alignment.
+
+    Args:
+        g: (str) the genomic character.
+        c: (str) the cds character.
+        h: (str) the hit character.
+
+    Returns:
+        (str) the symbol for the column. Columns which are gaps in all sequences return a gap, so they can be reported
+        with their position once the full alignment has been generated.
+
+    Raises:
+        ValueError: The column does not fit any of the expected cases.
+    """
+    # Evaluate each comparison once, rather than in every branch of the cases below.
+    genomic_gap, cds_gap, hit_gap = g == GAP, c == GAP, h == GAP
+    cds_match, hit_match = g == c, g == h
+
+    # Match.
+    if not genomic_gap and cds_match and hit_match:
+        return "|"
+    # Only in genomic.
+    elif not genomic_gap and cds_gap and hit_gap:
+        return "_"
+    # Only in hit.
+    elif genomic_gap and cds_gap and not hit_gap:
+        return "^"
+    # Only in genomic and cds.
+    elif not genomic_gap and not cds_gap and hit_gap:
+        return "="
+    # Only in cds (not expected).
+    elif not cds_gap and genomic_gap and hit_gap:
+        return "?"
+    # Mismatch between coding and genomic (not expected).
+    elif not cds_gap and not cds_match:
+        return "?"
+    # Mismatch in a region covered by the cds.
+    elif not hit_match and not cds_gap:
+        return "X"
+    # Mismatch in a region not covered by cds (ie, in a non coding region)
+    elif not hit_match and cds_gap:
+        return "."
+    # Match in a region not covered by cds.
+    elif not genomic_gap and hit_match and cds_gap:
+        return "O"
+    # All gaps, unexpected.
+    elif genomic_gap and cds_match and hit_match:
+        return GAP
+    # Unplanned logical error, make obvious
+    else:
+        raise ValueError(f"Unexpected case in alignment: {g}, {c}, {h}")
+
+
+class _SymbolTable(dict):
+    """
+    Maps (genomic, cds, hit) columns to their comparison symbol followed by their hit encoded symbol, classifying each
+    distinct column on first use. Matching positions are encoded with the hit character, uppercase for those that match
+    the CDS and lowercase for those that only match non-coding regions.
+    """
+    __slots__ = ()
+
+    def __missing__(self, column):
+        symbol = _classify_column(*column)
+        if symbol == "|":
+            hit_symbol = column[2].upper()
+        elif symbol == "O":
+            hit_symbol = column[2].lower()
+        else:
+            hit_symbol = symbol
+        symbols = self[column] = symbol + hit_symbol
+        return symbols
+
+
+def _span(sequence):
+    """
+    Find the extent of an aligned sequence, excluding any leading and trailing gaps.
+
+    Args:
+        sequence: (str) the aligned sequence.
+
+    Returns:
+        (tuple) the start and end (exclusive) positions of the sequence. Both are 0 if the sequence is only gaps.
+    """
+    end = len(sequence.rstrip(GAP))
+    start = end - len(sequence[:end].lstrip(GAP))
+    return start, end
+
+
+def _count_coding_insertions(full, start, end):
+    """
+    Count the hit insertions within an exon, between two positions of the full symbolic alignment.
+    """
+    # Runs are located with str.find, which skips between them far faster than a regular expression search.
+    coding_insertions = 0
+    run_start = full.find("^", start, end)
+    while run_start != -1:
+        run_end = INSERTION_RUN_PATTERN.match(full, run_start, end).end()
+        if run_start and full[run_start - 1] in CODING_SYMBOLS:
+            coding_insertions += run_end - run_start
+        run_start = full.find("^", run_end, end)
+    return coding_insertions
+
+
+def _count_cases(full, genomic, hit):
+    """
+    Count each of the comparison cases within an alignment, relative to the larger structures of its sequences.
+
+    Args:
+        full: (str) the full length, symbolic alignment representation.
+        genomic: (str) the aligned genomic sequence.
+        hit: (str) the aligned hit sequence.
+
+    Returns:
+        (AlignmentCounts) the number of positions of each case.
+    """
+    # --- Identify larger structures within the sequences ---
+
+    # Deletions can only occur within the hit span, anything else is an overhang of the query.
+    hit_start, hit_end = _span(hit)
+    # Without any hit, the query is entirely overhang and no other cases can occur.
+    if not hit_end:
+        return AlignmentCounts(0, 0, 0, 0, 0, 0, 0, 0, full.count("="), full.count("_"), 0, full.count("?"))
+
+    # Positions outside the genomic span are overhanging parts of the hit, and are never within an exon.
+    genomic_start, genomic_end = _span(genomic)
+
+    # --- Count character-by-character cases relative to these structures ---
+
+    # Each symbol is counted over the regions it needs to be split by, so the alignment is only scanned once for each.
+    coding_matches = full.count("|")
+    coding_mismatches = full.count("X")
+    non_coding_matches = full.count("O")
+    non_coding_mismatches = full.count(".")
+    uncounted = full.count("?")
+
+    non_coding_deletions = full.count("_", hit_start, hit_end)
+    non_coding_overhang = full.count("_", 0, hit_start) + full.count("_", hit_end)  # Outside the hit span
+    coding_deletions = full.count("=", hit_start, hit_end)
+    coding_overhang = full.count("=", 0, hit_start) + full.count("=", hit_end)  # Outside the hit span
+
+    # An insertion is within an exon if the last column with cds or genomic content before it was covered by the cds.
+    leading_coding_inserts = _count_coding_insertions(full, 0, genomic_start)
+    genomic_coding_inserts = _count_coding_insertions(full, genomic_start, genomic_end)
+    coding_inserts = leading_coding_inserts + genomic_coding_inserts
+    non_coding_inserts = full.count("^", genomic_start, genomic_end) - genomic_coding_inserts
+    unmatched_hit_overhang = (full.count("^", 0, genomic_start) - leading_coding_inserts +
+                              full.count("^", genomic_end))
+
+    return AlignmentCounts(coding_matches, coding_mismatches, non_coding_matches, non_coding_mismatches,
+                           coding_inserts, non_coding_inserts, coding_deletions, non_coding_deletions,
+                           coding_overhang, non_coding_overhang, unmatched_hit_overhang, uncounted)
+
+
 class SLAC(object):
+    # Instances are commonly created in bulk for many hits, so avoid a per-instance dict.
+    __slots__ = ("genomic", "cds", "hit", "size_limit", "_full", "_full_hit", "_short", "display_mode",
+                 "_frequency_threshold", "hit_span", "_counts", "_metrics")
+
     def __init__(self, genomic=None, cds=None, hit=None, size_limit=DEFAULT_SIZE,
                  frequency_threshold=DEFAULT_FREQ_THRESHOLD, display_mode=None, auto_align_cds_to_genomic=False):
         """
@@ -37,7 +343,8 @@ class SLAC(object):
         near arbitrary character length, at the expense of resolution.
 
         Args:
-            genomic: (str) the genomic sequence, aligned to the hit sequence.
+            genomic: (str) the genomic sequence, aligned to the hit sequence. Sequences may also be supplied as ASCII
+            bytes, bytearray or memoryview objects.
             cds: (str) the coding sequence. Ideally this will be supplied aligned to the other sequences, however an
             unaligned CDS can be provided and aligned to the genomic sequence if required - and a simple algorithm
             will attempt to align it to the genomic sequence.
@@ -57,81 +364,98 @@ class SLAC(object):
         Raises:
             ValueError: Conditions are not met for the input sequences.
         """
-        if genomic and not isinstance(genomic, str):
-            raise ValueError(f"genomic must be a string, not {type(genomic)}")
-        if cds and not isinstance(cds, str):
-            raise ValueError(f"cds must be a string, not {type(cds)}")
-        if hit and not isinstance(hit, str):
-            raise ValueError(f"hit must be a string, not {type(hit)}")
+        display_mode = _validate_display_mode(display_mode)
+        size_limit = _validate_size_limit(size_limit)
 
-        if not any([genomic, cds, hit]):
-            raise ValueError("No sequences supplied")
+        genomic, cds = self._prepare_template(genomic, cds, auto_align_cds_to_genomic)
+        self._setup(genomic, cds, hit, size_limit, frequency_threshold, display_mode)
 
-        if cds and not genomic:
-            raise ValueError("If a cds sequence is supplied, a genomic sequence must also be supplied. "
-                             "Supply cds as genomic if only cds is available as the cds is only a layer of context.")
-
-        if display_mode and display_mode not in [DISPLAY_MODE_SHORT, DISPLAY_MODE_FULL, DISPLAY_MODE_FULL_HIT]:
-            raise ValueError(f"Invalid display mode: {display_mode}. Must be one of: "
-                             f"{DISPLAY_MODE_SHORT}, {DISPLAY_MODE_FULL}, {DISPLAY_MODE_FULL_HIT}")
+    def _setup(self, genomic, cds, hit, size_limit, frequency_threshold, display_mode):
+        """
+        Set up the alignment from the prepared genomic and cds sequences and checked options, and generate its full
+        length representations and counts.
+        """
+        self.genomic = genomic
+        self.cds = cds
+        self.hit = _prepare_sequence(hit, "hit")
 
-        if not display_mode:
-            display_mode = DISPLAY_MODE_SHORT
+        if not any([self.genomic, self.cds, self.hit]):
+            raise ValueError("No sequences supplied")
 
-        if genomic and hit:
-            if len(genomic) != len(hit):
+        if self.genomic and self.hit:
+            if len(self.genomic) != len(self.hit):
                 raise ValueError("Genomic and hit sequences must be aligned, and therefore be the same length")
 
-        # Find the longest sequence to use as the basis for the alignment, accommodating absences.
-        max_length = max([len(genomic or ""), len(cds or ""), len(hit or "")])
-
-        self.genomic = genomic.upper().replace(" ", "-") if genomic else ""
-        self.cds = cds.upper().replace(" ", "-") if cds else ""
-        self.hit = hit.upper().replace(" ", "-")  if hit else ""
-        
-        # Perform auto alignment of cds to genomic if requested and required.
-        if auto_align_cds_to_genomic and all([self.genomic, self.hit]) and "-" not in self.cds: 
-            cds = self.align_cds_to_genomic(genomic, hit)
+        # The genomic sequence is the basis for the alignment, or the hit if only a hit was supplied. A cds can only be
+        # supplied with a genomic sequence, and is compared position by position against it.
+        alignment_length = len(self.genomic or self.hit)
 
         # Fill in blanks to allow use in cases where a sequence type was not provided
         if not self.genomic:
-            self.genomic = "-" * max_length
-        if not cds:
-            self.cds = "-" * max_length
-        if not hit:
-            self.hit = "-" * max_length
+            self.genomic = GAP * alignment_length
+        if not self.cds:
+            self.cds = GAP * alignment_length
+        if not self.hit:
+            self.hit = GAP * alignment_length
 
-        self.size_limit = int(size_limit)
+        self.size_limit = size_limit
         # The full length, symbolic alignment representation
         self._full = ''
         # The full length, symbolic alignment representation, characters that match the CDS in the hit use an uppercase
         # DNA character, and those that only match non-coding regions use a lowercase DNA character.
         self._full_hit = ''
-        # The shortened version of the symbolic alignment
-        self._short = ''
+        # The shortened version of the symbolic alignment, generated on first use as many callers only need the metrics.
+        self._short = None
         self.display_mode = display_mode
         self._frequency_threshold = frequency_threshold
-        self.identity_to_genomic = None
-        self.identity_to_cds = None
-        self.coverage_to_genomic = None
-        self.coverage_to_cds = None
-        self.concordance_to_genomic = None
-        self.concordance_to_cds = None
         self.hit_span = None
+        # Number of positions of each comparison case, from which the metrics are calculated.
+        self._counts = None
+        # The identity, coverage and concordance metrics, calculated on first use.
+        self._metrics = None
         self._generate_text()
 
+    @classmethod
+    def _from_template(cls, genomic, cds, hit, size_limit=DEFAULT_SIZE, frequency_threshold=DEFAULT_FREQ_THRESHOLD,
+                       display_mode=None):
+        """
+        Create a SLAC object from genomic and cds sequences already prepared by _prepare_template, so sequences shared
+        between many hits are only prepared once.
+        Args:
+            genomic: (str) the prepared genomic sequence.
+            cds: (str) the prepared coding sequence.
+            hit: (str) the hit sequence, aligned to the genomic sequence.
+            size_limit: (int) the maximum number of characters to display in the miniSLAC output.
+            frequency_threshold: (float) the proportion of each abbreviated block which must be the most common
+            character for the full version of that character to be used in the miniSLAC.
+            display_mode: (str) the default display mode for the object.
+        Returns:
+            (SLAC) the alignment.
+        """
+        aln = cls.__new__(cls)
+        aln._setup(genomic, cds, hit, _validate_size_limit(size_limit), frequency_threshold,
+                   _validate_display_mode(display_mode))
+        return aln
+
     def __str__(self):
         if self.display_mode == DISPLAY_MODE_FULL:
             return self._full
         elif self.display_mode == DISPLAY_MODE_FULL_HIT:
             return self._full_hit
         else:
-            return self._short
+            return self.short()
 
     def __repr__(self):
-        return self._short
+        return self.short()
 
     def short(self):
+        """
+        Returns the shortened version of the symbolic alignment (miniSLAC), generating it if required.
+        Returns:
+            (str) the miniSLAC, no longer than the size limit.
+        """
+        if self._short is None:
+            self._generate_short()
         return self._short
 
     def full(self, encoded_hit=False):
@@ -147,13 +471,72 @@ class SLAC(object):
             return self._full_hit
         return self._full
 
+    @property
+    def raw_counts(self):
+        """
+        (AlignmentCounts) the number of positions of each comparison case, from which the metrics are calculated.
+        """
+        return self._counts
+
+    @property
+    def identity_to_genomic(self):
+        """
+        (float) how much of the hit sequence is the same as the genomic sequence.
+        """
+        return self._get_metrics().identity_to_genomic
+
+    @property
+    def coverage_to_genomic(self):
+        """
+        (float) how much of the genomic sequence mapped to matches or mismatches. This is not the span of the total
+        alignment.
+        """
+        return self._get_metrics().coverage_to_genomic
+
+    @property
+    def concordance_to_genomic(self):
+        """
+        (float) the product of the identity and coverage to the genomic sequence.
+        """
+        return self._get_metrics().concordance_to_genomic
+
+    @property
+    def identity_to_cds(self):
+        """
+        (float) how much of the hit sequence is the same as the cds sequence.
+        """
+        return self._get_metrics().identity_to_cds
+
+    @property
+    def coverage_to_cds(self):
+        """
+        (float) how much of the cds sequence mapped to matches or mismatches. This is not the span of the alignment to
+        the cds.
+        """
+        return self._get_metrics().coverage_to_cds
+
+    @property
+    def concordance_to_cds(self):
+        """
+        (float) the product of the identity and coverage to the cds sequence.
+        """
+        return self._get_metrics().concordance_to_cds
+
     def set_size(self, size_limit):
-        self.size_limit = size_limit
-        self._generate_text()
+        """
+        Changes the maximum number of characters in the miniSLAC output. Only the miniSLAC is regenerated, on its next
+        use, as the full length representations do not depend on the size limit.
+        Args:
+            size_limit: (int) the maximum number of characters to display in the miniSLAC output.
+        Raises:
+            ValueError: The size limit is less than 1.
+        """
+        self.size_limit = _validate_size_limit(size_limit)
+        self._short = None
 
     def _generate_text(self):
         """
-        Generate the text representation of the alignment.
+        Generate the full length text representations of the alignment. The miniSLAC is generated on first use.
         Requires:
             Hit and query sequences are the same length
         Returns:
@@ -161,8 +544,6 @@ class SLAC(object):
         """
 
         self._generate_full()
-        self._generate_short()
-        self._generate_full_hit()
 
     def _generate_full(self):
         """
@@ -181,190 +562,88 @@ class SLAC(object):
         TODO - Update this to match the actual logic below
         """
 
-        coding_matches = 0
-        coding_mismatches = 0
-        non_coding_matches = 0
-        non_coding_mismatches = 0
-        coding_inserts = 0
-        non_coding_inserts = 0
-        coding_deletions = 0
-        non_coding_deletions = 0
-        uncounted = 0
-        unmatched_hit_overhang = 0
-        coding_overhang = 0  # Number of positions of the coding sequence outside the hit span
-        non_coding_overhang = 0  # Number of positions of the non-coding sequence outside the hit span
-
-        i = 0
-        in_exon = False
-        in_genomic = False
-        in_hit = False
-        for g, c, h in zip(self.genomic, self.cds, self.hit):
-
-            # --- Identify larger structures within the sequences ---
-
-            # We need to know if we're in an exon to correctly measure insertions relative to cds
-            if c != "-":
-                in_exon = True
-            # Kick out of an exon if we can see we've left it based on the genomic sequence.
-            # If we just said "if c == '-'" we could be inside an insertion and not know if it's a coding region or not.
-            elif c == "-" and g != "-":
-                in_exon = False
-
-            # Track if we're in an overhanging part of the hit
-            if g != "-":
-                in_genomic = True
-            elif self.genomic[i:len(self.genomic)] == "-" * (len(self.genomic) - i):
-                in_genomic = False
-                # If we've left the genomic seq we've definitely left any exons
-                in_exon = False
-
-            # Determine if we're within the hit span
-            if not in_hit and h != "-":
-                in_hit = True
-            elif in_hit and self.hit[i:len(self.hit)] == "-" * (len(self.hit) - i):
-                in_hit = False
-
-            # --- Determine character-by-character cases relative to these structures ---
-
-            # Match.
-            if g != "-" and g == c == h:
-                self._full += "|"
-                coding_matches += 1
-            # Only in genomic.
-            elif g != "-" and c == "-" and h == "-":
-                self._full += "_"
-                if in_hit:
-                    non_coding_deletions += 1
-                else:
-                    non_coding_overhang += 1
-            # Only in hit.
-            elif g == "-" and c == "-" and h != "-":
-                self._full += "^"
-                if in_exon:
-                    coding_inserts += 1
-                elif in_genomic:
-                    non_coding_inserts += 1
-                else:
-                    unmatched_hit_overhang += 1
-            # Only in genomic and cds.
-            elif g != "-" and c != "-" and h == "-":
-                self._full += "="
-                if in_hit:
-                    coding_deletions += 1
-                else:
-                    coding_overhang += 1
-            # Only in cds (not expected).
-            elif c != "-" and g == "-" and h == "-":
-                self._full += "?"
-                uncounted += 1
-            # Mismatch between coding and genomic (not expected).
-            elif c != "-" and g != c:
-                self._full += "?"
-                uncounted += 1
-            # Mismatch in a region covered by the cds.
-            elif h != g and c != "-":
-                self._full += "X"
-                coding_mismatches += 1
-            # Mismatch in a region not covered by cds (ie, in a non coding region)
-            elif h != g and c == "-":
-                self._full += "."
-                non_coding_mismatches += 1
-            # Match in a region not covered by cds.
-            elif g != "-" and h == g and c == "-":
-                self._full += "O"
-                non_coding_matches += 1
-            # All gaps, unexpected.
-            elif g == "-" and g == c == h:
-                raise ValueError(f"All sequences have gaps at position {i}. There may be issues with the alignment.")
-            # Unplanned logical error, make obvious
-            else:
-                self._full += "U"
-                raise ValueError(f"Unexpected case in alignment: {g}, {c}, {h}")
-
-            i += 1
-
-        # --- Calculate metrics ---
+        # Before the start and beyond the end of both the cds and the hit, every genomic base is only in the genomic.
+        # These stretches are often most of the alignment, so they are filled in as whole runs rather than by column.
+        length = min(len(self.genomic), len(self.cds), len(self.hit))
+        head_end = min(len(self.cds) - len(self.cds.lstrip(GAP)), len(self.hit) - len(self.hit.lstrip(GAP)), length)
+        tail_start = min(max(len(self.cds.rstrip(GAP)), len(self.hit.rstrip(GAP)), head_end), length)
+        if GAP in self.genomic[:head_end] or GAP in self.genomic[tail_start:length]:
+            # Columns of only gaps are left to the column by column pass, which reports them.
+            head_end, tail_start = 0, length
+        head = "_" * head_end
+        tail = "_" * (length - tail_start)
+
+        # Every column's symbol depends only on its genomic, cds and hit characters, so each distinct column is
+        # classified once and the rest of the alignment is mapped through that table in a single pass. Each column
+        # produces its symbol followed by its hit encoded symbol, which are then separated by slicing.
+        symbols = _SymbolTable()
+        encoded = "".join(map(symbols.__getitem__, zip(self.genomic[head_end:tail_start],
+                                                       self.cds[head_end:tail_start],
+                                                       self.hit[head_end:tail_start])))
+        self._full = head + encoded[::2] + tail
+        self._full_hit = head + encoded[1::2] + tail
+
+        # All gap columns are marked with a gap by the symbol table so they can be located after the pass.
+        gap_position = self._full.find(GAP)
+        if gap_position != -1:
+            raise ValueError(f"All sequences have gaps at position {gap_position}. "
+                             f"There may be issues with the alignment.")
+
+        self._counts = _count_cases(self._full, self.genomic, self.hit)
+
+    def _get_metrics(self):
+        if self._metrics is None:
+            self._metrics = self._calculate_metrics()
+        return self._metrics
+
+    def _calculate_metrics(self):
+        """
+        Calculate the identity, coverage and concordance metrics from the counts of each case within the alignment.
+        Returns:
+            (AlignmentMetrics) the metrics, as percentages.
+        """
+        counts = self._counts
 
-        if uncounted:
-            # print(f"There were {uncounted} uncounted positions in the alignment, applying None to metrics to avoid "
-            #       f"misleading results")
-            self.identity_to_genomic = None
-            self.identity_to_cds = None
-            self.coverage_to_genomic = None
-            self.coverage_to_cds = None
+        # Subtotals shared between the metrics.
+        genomic_matches = counts.coding_matches + counts.non_coding_matches
+        genomic_aligned = genomic_matches + counts.coding_mismatches + counts.non_coding_mismatches
+        cds_aligned = counts.coding_matches + counts.coding_mismatches
+        deletions = counts.coding_deletions + counts.non_coding_deletions
 
-        if coding_matches or non_coding_matches:
+        if genomic_matches:
             # This represents how much of the hit sequence is the same as the genomic sequence
-            self.identity_to_genomic = (float(coding_matches) + non_coding_matches) / (coding_matches +
-                                                                                       coding_mismatches +
-                                                                                       non_coding_matches +
-                                                                                       non_coding_mismatches +
-                                                                                       coding_inserts +
-                                                                                       non_coding_inserts +
-                                                                                       coding_deletions +
-                                                                                       non_coding_deletions)
-
-            self.identity_to_genomic = round(self.identity_to_genomic * 100, METRIC_DECIMALS)
+            identity_to_genomic = _percentage(genomic_matches, genomic_aligned + counts.coding_inserts +
+                                              counts.non_coding_inserts + deletions)
 
             # This represents how much of the genomic sequence mapped to matches or mismatches. This is not the span of
             # the total alignment.
-            self.coverage_to_genomic = (float(coding_matches) +
-                                        coding_mismatches +
-                                        non_coding_matches +
-                                        non_coding_mismatches) / (coding_matches +
-                                                                  coding_mismatches +
-                                                                  non_coding_matches +
-                                                                  non_coding_mismatches +
-                                                                  coding_deletions +
-                                                                  non_coding_deletions +
-                                                                  non_coding_overhang +
-                                                                  coding_overhang)
-
-            self.coverage_to_genomic = round(self.coverage_to_genomic * 100, METRIC_DECIMALS)
-
-            self.concordance_to_genomic = round((self.coverage_to_genomic * self.identity_to_genomic) / 100,
-                                                METRIC_DECIMALS)
+            coverage_to_genomic = _percentage(genomic_aligned, genomic_aligned + deletions +
+                                              counts.non_coding_overhang + counts.coding_overhang)
+
+            concordance_to_genomic = round((coverage_to_genomic * identity_to_genomic) / 100, METRIC_DECIMALS)
         else:
-            self.identity_to_genomic = 0
-            self.coverage_to_genomic = 0
-            self.concordance_to_genomic = 0
+            identity_to_genomic = 0
+            coverage_to_genomic = 0
+            concordance_to_genomic = 0
 
-        if coding_matches:
+        if counts.coding_matches:
             # This represents how much of the hit sequence is the same as the cds sequence
-            self.identity_to_cds = float(coding_matches) / (coding_matches +
-                                                            coding_mismatches +
-                                                            coding_inserts +
-                                                            coding_deletions)
-
-            self.identity_to_cds = round(self.identity_to_cds * 100, METRIC_DECIMALS)
+            identity_to_cds = _percentage(counts.coding_matches, cds_aligned + counts.coding_inserts +
+                                          counts.coding_deletions)
 
             # This represents how much of the cds sequence mapped to matches or mismatches. This is not the span of the
             # alignment to the cds.
-            self.coverage_to_cds = (float(coding_matches) + coding_mismatches) / (coding_matches +
-                                                                                  coding_mismatches +
-                                                                                  coding_deletions +
-                                                                                  coding_overhang)
+            coverage_to_cds = _percentage(cds_aligned, cds_aligned + counts.coding_deletions + counts.coding_overhang)
 
-            self.coverage_to_cds = round(self.coverage_to_cds * 100, METRIC_DECIMALS)
-
-            self.concordance_to_cds = round((self.coverage_to_cds * self.identity_to_cds) / 100, METRIC_DECIMALS)
+            concordance_to_cds = round((coverage_to_cds * identity_to_cds) / 100, METRIC_DECIMALS)
 
         else:
-            self.identity_to_cds = 0
-            self.coverage_to_cds = 0
-            self.concordance_to_cds = 0
-
-    def _generate_full_hit(self):
-        if not self._full:
-            self._generate_full()
-
-        for i, char in enumerate(self._full):
-            if char == "|":
-                self._full_hit += self.hit[i].upper()
-            elif char == "O":
-                self._full_hit += self.hit[i].lower()
-            else:
-                self._full_hit += self._full[i]
+            identity_to_cds = 0
+            coverage_to_cds = 0
+            concordance_to_cds = 0
+
+        return AlignmentMetrics(identity_to_genomic, coverage_to_genomic, concordance_to_genomic,
+                                identity_to_cds, coverage_to_cds, concordance_to_cds)
 
     def _generate_short(self):
         block_size = int(math.floor(float(len(self.genomic)) / self.size_limit))
@@ -372,52 +651,124 @@ class SLAC(object):
             self._short = self._full
             return
 
-        self._short = ""
+        # Hoist lookups out of the block loop.
+        full = self._full
+        full_length = len(full)
+        size_limit = self.size_limit
+        frequency_threshold = self._frequency_threshold
 
-        # Generate shortened version
+        # Generate shortened version, one character per block
+        short = []
         i = 0
-        while i < len(self._full):
+        while i < full_length:
 
             # If our next block would be the last one...
-            if len(self._short) + 1 == self.size_limit:
+            if len(short) + 1 == size_limit:
                 # Capture all the remaining characters and increment our counter.
-                block_size = len(self._full) - i
+                block_size = full_length - i
 
             # If we're about to run out of sequence without filling the size limit...
-            elif i + block_size >= len(self._full) and len(self._short) + 1 < self.size_limit:
+            elif i + block_size >= full_length and len(short) + 1 < size_limit:
                 # Shorten the final blocks to squeeze an extra one at the end.
                 block_size = max(1, block_size - 1)
 
-            block = self._full[i:i + block_size]
+            block = full[i:i + block_size]
 
             if len(block) > 1:
-                # Find the most common character in the block
-                counter = Counter(block)
-                common_char, count = counter.most_common(1)[0]
-                block_char = common_char
+                # Find the most common character in the block, favouring the earliest in the event of a tie. Blocks only
+                # contain a handful of distinct symbols, so counting each of them is cheaper than building a Counter.
+                block_char = max(dict.fromkeys(block), key=block.count)
+                count = block.count(block_char)
 
                 # Retain the character if it's preserved enough across this block
-                if count >= (float(block_size) * self._frequency_threshold):
-                    self._short += block_char
+                if count >= (float(block_size) * frequency_threshold):
+                    short.append(block_char)
 
                 # If the block only contains matches, whether they be to the cds + genomic, or only to the genomic
                 # sequence (ie UTR/intron), use the most frequent character.
-                elif all([char in ["|", "O"] for char in block]):
-                    self._short += block_char
+                elif not block.strip("|O"):
+                    short.append(block_char)
 
                 # If the block only contains parts of the query and has no coverage of the hit, use the most frequent
                 # character.
-                elif all([char in ["=", "_"] for char in block]):
-                    self._short += block_char
+                elif not block.strip("=_"):
+                    short.append(block_char)
 
                 else:
-                    self._short += SYMBOL_QUALITY_MAP[block_char][1]
+                    short.append(MIXED_SYMBOL_MAP[block_char])
 
             else:
-                self._short += block
+                short.append(block)
 
             i += block_size
 
+        self._short = "".join(short)
+
+    @classmethod
+    def _prepare_template(cls, genomic, cds, auto_align_cds_to_genomic):
+        """
+        Decode, check and normalise the genomic and coding sequences, aligning the cds to the genomic if requested.
+        Used for both single and batch construction, so the two accept the same inputs.
+
+        Args:
+            genomic: (str) the genomic sequence, or None if it was not supplied.
+            cds: (str) the coding sequence, or None if it was not supplied.
+            auto_align_cds_to_genomic: (bool) if True, aligns a cds without gaps to the genomic sequence.
+
+        Returns:
+            (tuple) the genomic and cds sequences, each an empty string if it was not supplied.
+
+        Raises:
+            ValueError: Conditions are not met for the input sequences.
+        """
+        genomic = _prepare_sequence(genomic, "genomic")
+        cds = _prepare_sequence(cds, "cds")
+
+        if cds and not genomic:
+            raise ValueError("If a cds sequence is supplied, a genomic sequence must also be supplied. "
+                             "Supply cds as genomic if only cds is available as the cds is only a layer of context.")
+
+        # Perform auto alignment of cds to genomic if requested and required.
+        if auto_align_cds_to_genomic and cds and GAP not in cds:
+            cds = cls.align_cds_to_genomic(genomic, cds)
+
+        # Lengths are checked once here so that the column pass can assume every sequence spans the whole alignment.
+        if cds and len(cds) != len(genomic):
+            if auto_align_cds_to_genomic:
+                # Auto alignment is only skipped for a cds with gaps, which is taken to be aligned already.
+                raise ValueError("Cds must be aligned to the genomic sequence, and therefore be the same length. "
+                                 "The cds contains gaps so was not auto aligned, supply it without gaps to align it.")
+            raise ValueError("Cds must be aligned to the genomic sequence, and therefore be the same length. "
+                             "Use auto_align_cds_to_genomic if the cds is unaligned.")
+
+        return genomic, cds
+
+    @classmethod
+    def from_many(cls, genomic, cds, hits, max_workers=1, **kwargs):
+        """
+        Create SLAC objects for many hits aligned to the same genomic and coding sequence. The shared sequences are
+        decoded, checked and normalised, and the cds aligned to the genomic if requested, once for all hits rather than
+        once per hit. The SLAC objects created in this process share the same genomic and cds strings.
+
+        Args:
+            genomic: (str) the genomic sequence, aligned to every hit sequence. Sequences may also be supplied as ASCII
+            bytes.
+            cds: (str) the coding sequence, or None if no coding sequence is available.
+            hits: (list) the hit sequences, each aligned to the genomic sequence.
+            max_workers: (int) the number of processes used to create the SLAC objects. Default is 1, which creates
+            them all in the current process.
+            **kwargs: further arguments passed on to each SLAC object, eg size_limit.
+
+        Returns:
+            (list) a SLAC object for each hit, in the order the hits were supplied.
+        """
+        genomic, cds = cls._prepare_template(genomic, cds, kwargs.pop("auto_align_cds_to_genomic", False))
+        # Every SLAC object holds the same prepared sequences, so a missing cds is filled in here once too.
+        if genomic and not cds:
+            cds = GAP * len(genomic)
+
+        return _create_all(partial(cls._from_template, genomic, cds, **kwargs), hits, max_workers=max_workers)
+
     @staticmethod
     def align_cds_to_genomic(aligned_genomic, cds, kmer_size=5):
         """
@@ -448,11 +799,11 @@ class SLAC(object):
             ValueError: If the CDS contains gaps or if the entire CDS cannot be aligned by the end of the genomic sequence.
         """
 
-        aligned_genomic = aligned_genomic.replace(" ", "-")
-        cds = cds.replace(" ", "-")
+        aligned_genomic = aligned_genomic.replace(" ", GAP)
+        cds = cds.replace(" ", GAP)
 
         # Confirm cds has no gaps, as this would suggest it's already aligned.
-        if "-" in cds:
+        if GAP in cds:
             raise ValueError("CDS should not contain gaps for auto alignment to genomic sequence")
 
         aligned_cds = []
@@ -461,10 +812,11 @@ class SLAC(object):
         i = 0
         while i < len(aligned_genomic):
 
-            # A gap in the genomic is always a gap in the CDS
-            if aligned_genomic[i] == "-":
-                aligned_cds.append('-')
-                i += 1
+            # A gap in the genomic is always a gap in the CDS, so the whole run of gaps can be carried over at once
+            if aligned_genomic[i] == GAP:
+                gap_run = GAP_RUN_PATTERN.match(aligned_genomic, i)
+                aligned_cds.append(gap_run.group())
+                i = gap_run.end()
                 continue
 
             match_found = False
@@ -488,9 +840,13 @@ class SLAC(object):
                     break  # Exit the k-mer size reduction loop since we found a match
 
             if not match_found:
-                # If no match is found, insert a gap in the CDS
-                aligned_cds.append('-')
-                i += 1  # Move to the next base in the genomic sequence
+                # No k-mer can match unless the next CDS base does, so insert gaps in the CDS up to the next genomic
+                # position matching that base, or to the end of the genomic sequence if the CDS has been used up.
+                next_match = aligned_genomic.find(cds[cds_index], i + 1) if cds_index < len(cds) else -1
+                if next_match == -1:
+                    next_match = len(aligned_genomic)
+                aligned_cds.append(GAP * (next_match - i))
+                i = next_match
 
         # Failure detection: check if we have unaligned characters left in the CDS
         if cds_index < len(cds):
@@ -499,3 +855,56 @@ class SLAC(object):
 
         return ''.join(aligned_cds)
 
+
+def slac_batch(genomic, cds, hit, max_workers=1, **kwargs):
+    """
+    Create SLAC objects for many alignments at once, optionally spread across several processes.
+
+    Args:
+        genomic: (list) the genomic sequences, each aligned to the hit sequence at the same index.
+        cds: (list) the coding sequences for each genomic sequence, or None if no coding sequences are available.
+        hit: (list) the hit sequences.
+        max_workers: (int) the number of processes used to create the SLAC objects. Default is 1, which creates them all
+        in the current process.
+        **kwargs: further arguments passed on to each SLAC object, eg size_limit.
+
+    Returns:
+        (list) a SLAC object for each alignment, in the order the sequences were supplied.
+
+    Raises:
+        ValueError: The numbers of sequences supplied do not match.
+    """
+    if len(genomic) != len(hit) or (cds is not None and len(cds) != len(genomic)):
+        raise ValueError("The same number of genomic, cds and hit sequences must be supplied")
+
+    if cds is None:
+        cds = repeat(None, len(genomic))
+
+    return _create_all(partial(SLAC, **kwargs), genomic, cds, hit, max_workers=max_workers)
+
+
+def _create_all(create, *sequences, max_workers=1):
+    """
+    Create an object for each set of sequences, optionally spread across several processes.
+
+    Args:
+        create: (callable) creates an object from one sequence of each of the supplied iterables. Must be picklable
+        if more than one process is used.
+        *sequences: (list) iterables of sequences, the objects are created from the sequences at the same index.
+        max_workers: (int) the number of processes used to create the objects. Default is 1, which creates them all in
+        the current process.
+
+    Returns:
+        (list) the created objects, in the order the sequences were supplied.
+    """
+    if max_workers <= 1:
+        return list(map(create, *sequences))
+
+    # Memoryviews cannot be pickled, so any sequences supplied as bytes are decoded before being sent to other
+    # processes.
+    sequences = [[_decode_sequence(sequence) for sequence in iterable] for iterable in sequences]
+
+    # Hand each process a few chunks of alignments, rather than sending them one at a time.
+    chunk_size = max(1, len(sequences[0]) // (max_workers * 4))
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(create, *sequences, chunksize=chunk_size))
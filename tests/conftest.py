@@ -0,0 +1,8 @@
+import os
+import sys
+
+# Make the top level package importable by every test module, once per session.
+top_dir = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+
+if top_dir not in sys.path:
+    sys.path.insert(0, top_dir)
@@ -1,15 +1,10 @@
-import os
-import sys
 import unittest
 
-# Get the local directory
-test_dir = os.path.dirname(os.path.realpath(__file__))
-top_dir = os.path.dirname(test_dir)
+from source import slac
 
-if top_dir not in sys.path:
-    sys.path.append(top_dir)
 
-from source import slac
+class SubSLAC(slac.SLAC):
+    __slots__ = ()
 
 
 class TestSLAC(unittest.TestCase):
@@ -24,6 +19,8 @@ class TestSLAC(unittest.TestCase):
         aligned_genomic = ("A" * 5) + ("G" * 10) + ("T" * 5)
         aligned_hit = aligned_genomic
         aln = slac.SLAC(genomic=aligned_genomic, hit=aligned_hit)
+        self.assertEqual(aln.raw_counts.non_coding_matches, 20, "Incorrect count of non-coding matches")
+        self.assertEqual(aln.raw_counts.coding_matches, 0, "Incorrect count of coding matches")
         self.assertEqual(aln.identity_to_genomic, float(100), "identity for full hit alignment is not 100%")
         self.assertEqual(aln.coverage_to_genomic, float(100), "coverage for full hit alignment is not 100%")
         self.assertEqual(aln.identity_to_cds, float(0), "identity for full hit alignment to genomic only is not 0%")
@@ -81,6 +78,9 @@ class TestSLAC(unittest.TestCase):
         aligned_cds = ("-" * 5) + ("C" * 10) + ("-" * 5)
         aligned_hit = ("A" * 5) + ("-" * 15)
         aln = slac.SLAC(genomic=aligned_genomic, cds=aligned_cds, hit=aligned_hit)
+        self.assertEqual(aln.raw_counts.non_coding_matches, 5, "Incorrect count of non-coding matches")
+        self.assertEqual(aln.raw_counts.coding_overhang, 10, "Incorrect count of coding overhang")
+        self.assertEqual(aln.raw_counts.non_coding_overhang, 5, "Incorrect count of non-coding overhang")
         self.assertEqual(aln.identity_to_genomic, float(100), "Incorrect identity to genomic")
         self.assertEqual(aln.coverage_to_genomic, round(float(5/20)*100, 3), "Incorrect coverage to genomic")
 
@@ -92,7 +92,161 @@ class TestSLAC(unittest.TestCase):
         self.assertEqual(aln.identity_to_genomic, float(100), "Incorrect identity to genomic")
         self.assertEqual(aln.coverage_to_genomic, round(float(1/20)*100, 3), "Incorrect coverage to genomic")
 
+    def test_overhangs_outside_spans(self):
+        # Hit overhangs either side of the genomic, with insertions inside and outside of the exon
+        aligned_genomic = "---" + "AAAAA" + "--" + "CCCCCCCCCC" + "--" + "TTTTT" + "----"
+        aligned_cds = "---" + "-----" + "--" + "CCCCCCCCCC" + "--" + "-----" + "----"
+        aligned_hit = "GGG" + "AAAAA" + "GG" + "CCCCCCCCCC" + "GG" + "TTT--" + "GGGG"
+        aln = slac.SLAC(genomic=aligned_genomic, cds=aligned_cds, hit=aligned_hit)
+        self.assertEqual(aln.full(), "^^^OOOOO^^||||||||||^^OOO__^^^^", "Incorrect full alignment")
+        self.assertEqual(aln.raw_counts, slac.AlignmentCounts(coding_matches=10, coding_mismatches=0,
+                                                              non_coding_matches=8, non_coding_mismatches=0,
+                                                              coding_inserts=2, non_coding_inserts=2,
+                                                              coding_deletions=0, non_coding_deletions=2,
+                                                              coding_overhang=0, non_coding_overhang=0,
+                                                              unmatched_hit_overhang=7, uncounted=0),
+                         "Incorrect counts of each case")
+        self.assertEqual(aln.identity_to_genomic, float(75), "Incorrect identity to genomic")
+        self.assertEqual(aln.coverage_to_genomic, float(90), "Incorrect coverage to genomic")
+        self.assertEqual(aln.identity_to_cds, round(float(10/12)*100, 3), "Incorrect identity to cds")
+        self.assertEqual(aln.coverage_to_cds, float(100), "Incorrect coverage to cds")
+
+        # Genomic and cds overhang either side of the hit
+        aligned_genomic = "AAAAACCCCCTTTTT"
+        aligned_cds = "-----CCCCC-----"
+        aligned_hit = "--AAACC--CTTT--"
+        aln = slac.SLAC(genomic=aligned_genomic, cds=aligned_cds, hit=aligned_hit)
+        self.assertEqual(aln.full(), "__OOO||==|OOO__", "Incorrect full alignment")
+        self.assertEqual(aln.identity_to_genomic, round(float(9/11)*100, 3), "Incorrect identity to genomic")
+        self.assertEqual(aln.coverage_to_genomic, float(60), "Incorrect coverage to genomic")
+        self.assertEqual(aln.identity_to_cds, float(60), "Incorrect identity to cds")
+        self.assertEqual(aln.coverage_to_cds, float(60), "Incorrect coverage to cds")
+
+    def test_set_size(self):
+        aligned_genomic = ("A" * 5) + ("C" * 10) + ("T" * 5)
+        aligned_cds = ("-" * 5) + ("C" * 10) + ("-" * 5)
+        aligned_hit = ("A" * 5) + ("-" * 15)
+        aln = slac.SLAC(genomic=aligned_genomic, cds=aligned_cds, hit=aligned_hit)
+        self.assertEqual(aln.short(), "OOOOO==========_____", "Incorrect short alignment within the size limit")
+
+        aln.set_size(10)
+        self.assertEqual(aln.short(), "OOo=====__", "Incorrect short alignment after resizing")
+        self.assertEqual(aln.full(), "OOOOO==========_____", "Full alignment changed after resizing")
+
+        aln.set_size(4)
+        self.assertEqual(aln.short(), "O==_", "Incorrect short alignment after resizing")
+        self.assertEqual(aln.full(encoded_hit=True), "aaaaa==========_____", "Hit alignment changed after resizing")
+
+        with self.assertRaises(ValueError):
+            aln.set_size(0)
+        self.assertEqual(aln.short(), "O==_", "Short alignment changed after an invalid resize")
+        with self.assertRaises(ValueError):
+            slac.SLAC(genomic=aligned_genomic, cds=aligned_cds, hit=aligned_hit, size_limit=0)
+
+    def test_auto_align_cds_to_genomic(self):
+        aligned_genomic = ("a" * 5) + ("c" * 10) + ("t" * 5)
+        cds = "C" * 10
+        aligned_hit = ("A" * 5) + ("C" * 10) + ("T" * 5)
+        aln = slac.SLAC(genomic=aligned_genomic, cds=cds, hit=aligned_hit, auto_align_cds_to_genomic=True)
+        self.assertEqual(aln.cds, ("-" * 5) + ("C" * 10) + ("-" * 5), "Incorrect cds alignment to genomic")
+        self.assertEqual(aln.full(), "OOOOO||||||||||OOOOO", "Incorrect full alignment")
+        self.assertEqual(aln.identity_to_cds, float(100), "Incorrect identity to cds")
+        self.assertEqual(aln.coverage_to_cds, float(100), "Incorrect coverage to cds")
+
+        # The cds is aligned in the same way without a hit, both alone and for many hits
+        aln = slac.SLAC(genomic=aligned_genomic, cds=cds, auto_align_cds_to_genomic=True)
+        self.assertEqual(aln.full(), "_____==========_____", "Incorrect full alignment without a hit")
+        alns = slac.SLAC.from_many(aligned_genomic, cds, [None], auto_align_cds_to_genomic=True)
+        self.assertEqual(alns[0].full(), aln.full(), "Incorrect full alignment without a hit from many hits")
+
+    def test_invalid_sequences(self):
+        aligned_genomic = ("A" * 5) + ("C" * 10) + ("T" * 5)
+        with self.assertRaises(ValueError):
+            slac.SLAC(genomic=aligned_genomic, cds="C" * 10, hit=aligned_genomic)
+        with self.assertRaisesRegex(ValueError, "contains gaps"):
+            slac.SLAC(genomic=aligned_genomic, cds="--" + "C" * 10, hit=aligned_genomic, auto_align_cds_to_genomic=True)
+        with self.assertRaises(ValueError):
+            slac.SLAC(genomic=aligned_genomic, hit=aligned_genomic[:-1] + "\u00c5")
+
+    def test_bytes_sequences(self):
+        aligned_genomic = ("A" * 5) + ("C" * 10) + ("T" * 5)
+        aligned_cds = ("-" * 5) + ("C" * 10) + ("-" * 5)
+        aligned_hit = ("a" * 5) + ("-" * 15)
+        expected = slac.SLAC(genomic=aligned_genomic, cds=aligned_cds, hit=aligned_hit)
+        encoded = [sequence.encode("ascii") for sequence in [aligned_genomic, aligned_cds, aligned_hit]]
+        for convert in [bytes, bytearray, memoryview]:
+            aln = slac.SLAC(*[convert(sequence) for sequence in encoded])
+            self.assertEqual(aln.full(encoded_hit=True), expected.full(encoded_hit=True),
+                             "Incorrect alignment from bytes")
+            self.assertEqual(aln.raw_counts, expected.raw_counts, "Incorrect counts from bytes")
+
+        with self.assertRaises(ValueError):
+            slac.SLAC(genomic=aligned_genomic.encode("ascii"), hit=b"\xc5" * 20)
+
+        # Every second base of a doubled sequence is read from a strided view
+        aln = slac.SLAC(*[memoryview(bytes(b for base in sequence for b in (base, base)))[::2] for sequence in encoded])
+        self.assertEqual(aln.full(encoded_hit=True), expected.full(encoded_hit=True),
+                         "Incorrect alignment from a non-contiguous memoryview")
+
+        # Bytes-like sequences can be handed to other processes
+        alns = slac.SLAC.from_many(encoded[0], encoded[1], [memoryview(encoded[2])] * 2, max_workers=2)
+        self.assertEqual([aln.raw_counts for aln in alns], [expected.raw_counts] * 2,
+                         "Incorrect counts from bytes across processes")
+        alns = slac.slac_batch([memoryview(encoded[0])] * 2, None, [aligned_hit] * 2, max_workers=2)
+        self.assertEqual([aln.coverage_to_genomic for aln in alns], [expected.coverage_to_genomic] * 2,
+                         "Incorrect coverage to genomic from bytes across processes")
+
+    def test_slac_batch(self):
+        aligned_genomic = ("A" * 5) + ("C" * 10) + ("T" * 5)
+        aligned_cds = ("-" * 5) + ("C" * 10) + ("-" * 5)
+        aligned_hits = [aligned_genomic, ("A" * 5) + ("-" * 15), "A" + "-" * 19, "-" * 20]
+        expected = [slac.SLAC(genomic=aligned_genomic, cds=aligned_cds, hit=hit, size_limit=10) for hit in aligned_hits]
+
+        for max_workers in [1, 2]:
+            alns = slac.slac_batch([aligned_genomic] * 4, [aligned_cds] * 4, aligned_hits, max_workers=max_workers,
+                                   size_limit=10)
+            self.assertEqual([aln.short() for aln in alns], [aln.short() for aln in expected],
+                             "Incorrect batch short alignments")
+            self.assertEqual([aln.coverage_to_genomic for aln in alns], [aln.coverage_to_genomic for aln in expected],
+                             "Incorrect batch coverage to genomic")
+
+        alns = slac.slac_batch([aligned_genomic] * 4, None, aligned_hits)
+        self.assertEqual([aln.identity_to_cds for aln in alns], [0] * 4, "Incorrect batch identity without cds")
+
+        with self.assertRaises(ValueError):
+            slac.slac_batch([aligned_genomic] * 3, None, aligned_hits)
+
+    def test_from_many(self):
+        genomic = ("a" * 5) + ("c" * 10) + ("t" * 5)
+        cds = "C" * 10
+        hits = [genomic.upper(), ("A" * 5) + ("-" * 15), "-" * 20]
+        expected = [slac.SLAC(genomic=genomic, cds=cds, hit=hit, size_limit=10, auto_align_cds_to_genomic=True)
+                    for hit in hits[:2]]
+
+        alns = slac.SLAC.from_many(genomic, cds, hits, size_limit=10, auto_align_cds_to_genomic=True)
+        self.assertEqual([aln.short() for aln in alns[:2]], [aln.short() for aln in expected],
+                         "Incorrect short alignments from many hits")
+        self.assertEqual([aln.identity_to_cds for aln in alns], [float(100), 0, 0], "Incorrect identity to cds")
+        self.assertEqual(alns[2].full(), "_____==========_____", "Incorrect full alignment without a hit")
+
+        alns = slac.SLAC.from_many(genomic, cds, hits, max_workers=2, size_limit=10, auto_align_cds_to_genomic=True)
+        self.assertEqual([aln.short() for aln in alns[:2]], [aln.short() for aln in expected],
+                         "Incorrect short alignments from many hits across processes")
+
+        for shared_cds in [cds, None]:
+            alns = slac.SLAC.from_many(genomic, shared_cds, hits, auto_align_cds_to_genomic=True)
+            self.assertTrue(all(aln.genomic is alns[0].genomic and aln.cds is alns[0].cds for aln in alns),
+                            "Template sequences not shared between many hits")
+
+        for max_workers in [1, 2]:
+            alns = SubSLAC.from_many(genomic, cds, hits, max_workers=max_workers, auto_align_cds_to_genomic=True)
+            self.assertTrue(all(isinstance(aln, SubSLAC) for aln in alns), "Incorrect class from many hits")
+
+        alns = slac.SLAC.from_many(genomic, None, hits)
+        self.assertEqual([aln.coverage_to_genomic for aln in alns], [float(100), float(25), 0],
+                         "Incorrect coverage to genomic without cds")
+
+        with self.assertRaises(ValueError):
+            slac.SLAC.from_many(genomic, cds, hits)
 
-if __name__ == '__main__':
-    unittest.main()
 #%%